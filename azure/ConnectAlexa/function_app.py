@@ -1,14 +1,18 @@
-import json
 import logging
 import os
 import hmac
-import hashlib
 import base64
-from typing import Optional
+import binascii
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 
-import requests
+import fastjsonschema
+import orjson
 import azure.functions as func
 
+if TYPE_CHECKING:
+    import requests
+
 # ===== Azure Functions App =====
 app = func.FunctionApp()
 
@@ -20,15 +24,35 @@ LINE_PUSH_URL = "https://api.line.me/v2/bot/message/push"
 # ・LINE_CHANNEL_ACCESS_TOKEN: Messaging API のチャネルアクセストークン（長期）
 # ・LINE_CHANNEL_SECRET:       Messaging API のチャネルシークレット（署名検証に使用）
 # ・LINE_DEVELOPER_ID:         デバッグ用に Push する先（U... の userId 推奨）
-CHANNEL_ACCESS_TOKEN = os.environ["LINE_CHANNEL_ACCESS_TOKEN"]
-CHANNEL_SECRET = os.environ["LINE_CHANNEL_SECRET"]
-# 任意。なければ Alexa → LINE Push はスキップ
-DEVELOPER_ID = os.environ.get("LINE_DEVELOPER_ID")
+# コールドスタートを軽くし、後から設定されたシークレットも拾えるよう、
+# 環境変数は初回利用時に読む（読めた値だけキャッシュされる）
+
+
+@lru_cache(maxsize=1)
+def _channel_secret_bytes() -> bytes:
+    # 署名検証用のキーは一度だけエンコードしておく
+    return os.environ["LINE_CHANNEL_SECRET"].encode("utf-8")
+
+
+@lru_cache(maxsize=1)
+def _session() -> "requests.Session":
+    # requests の import もここまで遅らせる。
+    # ウォームインスタンスでは TCP/TLS 接続を使い回す（keep-alive）
+    import requests
+    from requests.adapters import HTTPAdapter
 
-HEADERS = {
-    "Content-Type": "application/json",
-    "Authorization": f"Bearer {CHANNEL_ACCESS_TOKEN}",
-}
+    s = requests.Session()
+    s.headers.update({
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {os.environ['LINE_CHANNEL_ACCESS_TOKEN']}",
+    })
+    s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return s
+
+
+def _developer_id() -> Optional[str]:
+    # 任意。なければ Alexa → LINE Push はスキップ
+    return os.environ.get("LINE_DEVELOPER_ID")
 
 # ===== Utilities =====
 
@@ -39,27 +63,35 @@ def verify_line_signature(req: func.HttpRequest, raw_body: bytes) -> bool:
     if not signature:
         logging.warning("Missing X-Line-Signature")
         return False
-    mac = hmac.new(CHANNEL_SECRET.encode("utf-8"),
-                   raw_body, hashlib.sha256).digest()
-    expected = base64.b64encode(mac).decode("utf-8")
-    if not hmac.compare_digest(signature, expected):
+    try:
+        received = base64.b64decode(signature, validate=True)
+    except (binascii.Error, ValueError):
+        logging.warning("Malformed signature")
+        return False
+    try:
+        key = _channel_secret_bytes()
+    except KeyError:
+        logging.error("LINE_CHANNEL_SECRET is not set")
+        return False
+    # hmac.digest は HMAC オブジェクトを作らず OpenSSL のワンショット実装を使う
+    expected = hmac.digest(key, raw_body, "sha256")
+    if not hmac.compare_digest(received, expected):
         logging.warning("Invalid signature")
         return False
     return True
 
 
-def line_reply(reply_token: str, messages: list[dict]) -> requests.Response:
+def line_reply(reply_token: str, messages: list[dict]) -> "requests.Response":
     payload = {"replyToken": reply_token, "messages": messages}
-    r = requests.post(LINE_REPLY_URL, headers=HEADERS,
-                      json=payload, timeout=10)
+    r = _session().post(LINE_REPLY_URL, data=orjson.dumps(payload), timeout=10)
     logging.info(f"[LINE reply] {r.status_code} {r.text}")
     return r
 
 
-def line_push(to_id: str, messages: list[dict]) -> requests.Response:
+def line_push(to_id: str, messages: list[dict]) -> "requests.Response":
     # to_id は U... / R... / C... の ID である必要あり（LINEの “LINE ID” は不可）
     payload = {"to": to_id, "messages": messages}
-    r = requests.post(LINE_PUSH_URL, headers=HEADERS, json=payload, timeout=10)
+    r = _session().post(LINE_PUSH_URL, data=orjson.dumps(payload), timeout=10)
     logging.info(f"[LINE push] to={to_id[:6]}.. {r.status_code} {r.text}")
     return r
 
@@ -67,6 +99,44 @@ def line_push(to_id: str, messages: list[dict]) -> requests.Response:
 def build_text(text: str) -> dict:
     return {"type": "text", "text": text}
 
+
+# Alexa リクエストの形をモジュール読み込み時に一度だけコンパイルした検証関数で確認する
+_validate_alexa = fastjsonschema.compile({
+    "type": "object",
+    "required": ["request"],
+    "properties": {
+        "request": {
+            "type": "object",
+            "required": ["type"],
+            "properties": {
+                "type": {"type": "string"},
+                "intent": {
+                    "type": "object",
+                    "required": ["name"],
+                    "properties": {
+                        "name": {"type": "string"},
+                        "slots": {
+                            "type": "object",
+                            "additionalProperties": {
+                                "type": "object",
+                                "properties": {"slotValue": {"type": "object"}},
+                            },
+                        },
+                    },
+                },
+            },
+            "if": {"properties": {"type": {"const": "IntentRequest"}}},
+            "then": {"required": ["intent"]},
+        },
+    },
+})
+
+
+def _slot_value(intent: dict, name: str) -> Optional[str]:
+    # スロットは発話次第で欠けるので、ここだけは任意扱い
+    slot = intent.get("slots", {}).get(name, {})
+    return slot.get("slotValue", {}).get("value")
+
 # ===== Alexa endpoint (→ LINE に転送も可能) =====
 
 
@@ -78,27 +148,33 @@ def alexa(req: func.HttpRequest) -> func.HttpResponse:
     except ValueError:
         return func.HttpResponse("Invalid JSON", status_code=400)
 
-    request = body.get("request") or {}
-    req_type = request.get("type")
+    try:
+        _validate_alexa(body)
+    except fastjsonschema.JsonSchemaException as e:
+        logging.warning(f"Invalid Alexa request: {e.message}")
+        return func.HttpResponse("Invalid Alexa request", status_code=400)
+
+    # 以降は検証済みなので必須キーは直接参照できる
+    request = body["request"]
+    req_type = request["type"]
 
     if req_type == "LaunchRequest":
         text = "こんにちは。Azure Functions です。"
         should_end = False
 
     elif req_type == "IntentRequest":
-        intent = (request.get("intent") or {}).get("name", "UnknownIntent")
+        intent = request["intent"]["name"]
         if intent == "SendMessage":
-            text = request.get("intent", {}).get("slots", {}).get(
-                "message", {}).get("slotValue", {}).get("value")
+            text = _slot_value(request["intent"], "message")
         elif intent == "SendText":
-            text = request.get("intent", {}).get("slots", {}).get(
-                "text", {}).get("slotValue", {}).get("value")
+            text = _slot_value(request["intent"], "text")
 
         should_end = True
 
-        if DEVELOPER_ID and DEVELOPER_ID.startswith(("U", "R", "C")):
+        developer_id = _developer_id()
+        if developer_id and developer_id.startswith(("U", "R", "C")):
             try:
-                line_push(DEVELOPER_ID, [
+                line_push(developer_id, [
                     build_text(text)])
             except Exception as e:
                 logging.exception(f"LINE push error: {e}")
@@ -117,7 +193,7 @@ def alexa(req: func.HttpRequest) -> func.HttpResponse:
         },
     }
     return func.HttpResponse(
-        body=json.dumps(alexa_response, ensure_ascii=False),
+        body=orjson.dumps(alexa_response),  # UTF-8 のまま出力（ensure_ascii=False 相当）
         status_code=200,
         mimetype="application/json",
     )
@@ -134,7 +210,7 @@ def line_webhook(req: func.HttpRequest) -> func.HttpResponse:
         return func.HttpResponse("Signature verification failed", status_code=401)
 
     try:
-        body = json.loads(raw_body.decode("utf-8"))
+        body = orjson.loads(raw_body)
     except Exception:
         return func.HttpResponse("Bad Request", status_code=400)
 
@@ -185,7 +261,7 @@ def manual_push(req: func.HttpRequest) -> func.HttpResponse:
     except ValueError:
         return func.HttpResponse("Invalid JSON", status_code=400)
 
-    to = body.get("to") or DEVELOPER_ID
+    to = body.get("to") or _developer_id()
     text = body.get("text") or "hello from Azure Functions"
     if not to or not to.startswith(("U", "R", "C")):
         return func.HttpResponse("Invalid 'to' (must start with U/R/C)", status_code=400)
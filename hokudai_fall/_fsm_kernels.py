@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+# Numba is optional: without it the kernels below run as plain Python,
+# which is still cheaper than NumPy's dispatch overhead on ~10-element windows.
+try:
+    from numba import njit  # type: ignore
+except ImportError:  # pragma: no cover
+    def njit(*args, **kwargs):  # type: ignore
+        def deco(fn):
+            return fn
+        return deco
+
+
+@njit(cache=True)
+def _select(a: np.ndarray, k: int) -> float:
+    # Quickselect (Hoare partition, in place): afterwards a[:k] <= a[k] <= a[k+1:]
+    lo = 0
+    hi = a.shape[0] - 1
+    while lo < hi:
+        pivot = a[(lo + hi) // 2]
+        i = lo
+        j = hi
+        while i <= j:
+            while a[i] < pivot:
+                i += 1
+            while a[j] > pivot:
+                j -= 1
+            if i <= j:
+                t = a[i]
+                a[i] = a[j]
+                a[j] = t
+                i += 1
+                j -= 1
+        if k <= j:
+            hi = j
+        elif k >= i:
+            lo = i
+        else:
+            break
+    return a[k]
+
+
+@njit(cache=True, fastmath=True)
+def still_score(hip_y: np.ndarray, v_th: float) -> Tuple[float, float, bool]:
+    # Per-frame |Δhip_y| over the window → (80th percentile, fraction <= v_th, still?).
+    # Percentile uses linear interpolation, matching np.percentile's default.
+    n = hip_y.shape[0] - 1
+    if n <= 0:
+        return 0.0, 1.0, True
+    d = np.empty(n, dtype=np.float32)
+    ok = 0
+    for i in range(n):
+        v = abs(hip_y[i + 1] - hip_y[i])
+        if v <= v_th:
+            ok += 1
+        d[i] = v
+    pos = 0.8 * (n - 1)
+    lo = int(pos)
+    q_lo = _select(d, lo)
+    q80 = q_lo
+    if lo + 1 < n:
+        # after selection everything right of lo is >= d[lo]; its min is the next order statistic
+        q_hi = d[lo + 1]
+        for i in range(lo + 2, n):
+            if d[i] < q_hi:
+                q_hi = d[i]
+        q80 = q_lo + (q_hi - q_lo) * (pos - lo)
+    frac_ok = ok / n
+    return float(q80), frac_ok, (q80 < v_th * 1.2) and (frac_ok >= 0.7)
+
+
+@njit(cache=True, fastmath=True)
+def drop_from_prior_min(hip_y: np.ndarray) -> float:
+    # Last hip_y minus the minimum of the ones before it (window length >= 2)
+    m = hip_y[0]
+    for i in range(1, hip_y.shape[0] - 1):
+        if hip_y[i] < m:
+            m = hip_y[i]
+    return float(hip_y[hip_y.shape[0] - 1] - m)
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+import logging
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
-import cv2
 import numpy as np
 
 from .pose import Keypoint, PoseResult
+from .utils import load_cv2
+
+if TYPE_CHECKING:
+    import cv2
 
 # Minimal set of MediaPipe Pose connections for visualization
 MEDIAPIPE_EDGES = [
@@ -17,27 +23,195 @@ MEDIAPIPE_EDGES = [
     (23, 25), (25, 27),  # left leg
     (24, 26), (26, 28),  # right leg
 ]
+_EDGES_NP = np.asarray(MEDIAPIPE_EDGES, dtype=np.int32)
+_EDGES_A = _EDGES_NP[:, 0]
+_EDGES_B = _EDGES_NP[:, 1]
+_EDGES_MAX = int(_EDGES_NP.max())
+
+# Face detectors keep per-call state (cv2.dnn.Net input/outputs), so each thread that
+# blurs (saver encode pool) gets its own instance, loaded once per thread and reused
+_DETECTORS = threading.local()
+
+
+def _face_cascade() -> cv2.CascadeClassifier:
+    cascade = getattr(_DETECTORS, "cascade", None)
+    if cascade is None:
+        cv2 = load_cv2()
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        if cascade.empty():
+            raise RuntimeError("Failed to load Haar cascade: haarcascade_frontalface_default.xml")
+        _DETECTORS.cascade = cascade
+    return cascade
+
+
+# SSD-ResNet (res10) face detector settings; nets are keyed by (model, config) path
+_DNN_INPUT_SIZE = (320, 240)
+_DNN_MEAN = (104.0, 177.0, 123.0)
+
+
+def _face_net(model_path: str, config_path: str, accel: str = "cpu") -> "cv2.dnn.Net":
+    nets: Optional[Dict[Tuple[str, str, str], "cv2.dnn.Net"]] = getattr(_DETECTORS, "nets", None)
+    if nets is None:
+        nets = _DETECTORS.nets = {}
+    key = (model_path, config_path, accel)
+    net = nets.get(key)
+    if net is None:
+        cv2 = load_cv2()
+        net = cv2.dnn.readNetFromCaffe(config_path, model_path)
+        # accel comes from resolve_accel: "cuda" only when requested and a device is present
+        if accel == "cuda":
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+        else:
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL if accel == "opencl" else cv2.dnn.DNN_TARGET_CPU)
+        nets[key] = net
+    return net
+
+
+def _detect_faces_dnn(frame: np.ndarray, model_path: str, config_path: str, conf_th: float, accel: str = "cpu") -> List[Tuple[int, int, int, int]]:
+    cv2 = load_cv2()
+    h, w = frame.shape[:2]
+    net = _face_net(model_path, config_path, accel)
+    net.setInput(cv2.dnn.blobFromImage(frame, 1.0, _DNN_INPUT_SIZE, _DNN_MEAN))
+    det = net.forward()[0, 0]  # N x [image_id, label, conf, x0, y0, x1, y1] (normalized)
+    det = det[det[:, 2] > conf_th]
+    if det.size == 0:
+        return []
+    boxes = det[:, 3:7] * np.array([w, h, w, h], dtype=np.float32)
+    boxes = np.clip(boxes, 0, [w, h, w, h]).astype(np.int32)
+    return [(int(x0), int(y0), int(x1 - x0), int(y1 - y0)) for x0, y0, x1, y1 in boxes]
+
+
+# MediaPipe face landmarks: nose, eyes (inner/center/outer), ears, mouth corners
+_FACE_LM_MAX = 10
+_FACE_LM_MIN_SCORE = 0.5
+
+
+def face_roi_from_pose(pose: PoseResult, frame_shape: Tuple[int, ...], pad: float = 1.0) -> Optional[List[Tuple[int, int, int, int]]]:
+    # Face box from pose landmarks 0-10, padded by `pad` x its size on each side (the landmarks
+    # span eyes-to-mouth only). None when too few are confident: caller should use a detector.
+    n = min(len(pose.kp_score), _FACE_LM_MAX + 1)
+    ok = pose.kp_score[:n] >= _FACE_LM_MIN_SCORE
+    if int(ok.sum()) < 3:
+        return None
+    pts = pose.xy[:n][ok]
+    (x0, y0), (x1, y1) = pts.min(axis=0).tolist(), pts.max(axis=0).tolist()
+    side = max(x1 - x0, y1 - y0, 8)
+    p = int(side * pad)
+    h, w = frame_shape[:2]
+    x0, y0 = max(0, x0 - p), max(0, y0 - p)
+    x1, y1 = min(w, x1 + p), min(h, y1 + p)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return [(x0, y0, x1 - x0, y1 - y0)]
+
+
+@lru_cache(maxsize=8)
+def _gauss_1d(k: int) -> np.ndarray:
+    # 1-D Gaussian taps for a k x k blur (sigma derived from k, as GaussianBlur(..., 0) does)
+    return load_cv2().getGaussianKernel(k, 0)
+
+
+_CUDA_MAX_KSIZE = 31  # cv2.cuda linear filters take kernels up to 32 taps
+
+
+@lru_cache(maxsize=None)
+def resolve_accel(accel: str) -> str:
+    # Face-blur backend actually usable in this OpenCV build: "cpu" | "opencl" | "cuda".
+    # Unavailable requests fall back to "cpu" (warned once).
+    cv2 = load_cv2()
+    accel = (accel or "cpu").lower()
+    if accel == "opencl":
+        if cv2.ocl.haveOpenCL():
+            cv2.ocl.setUseOpenCL(True)
+            return "opencl"
+    elif accel == "cuda":
+        try:
+            if cv2.cuda.getCudaEnabledDeviceCount() > 0 and hasattr(cv2.cuda, "createGaussianFilter"):
+                return "cuda"
+        except Exception:
+            pass
+    elif accel == "cpu":
+        return "cpu"
+    logging.warning("Face-blur accel '%s' not available in this OpenCV build; using CPU", accel)
+    return "cpu"
+
+
+def _cuda_gauss(k: int):
+    # per-thread: cv2.cuda filters are not safe to share between threads
+    filters = getattr(_DETECTORS, "cuda_gauss", None)
+    if filters is None:
+        filters = _DETECTORS.cuda_gauss = {}
+    f = filters.get(k)
+    if f is None:
+        cv2 = load_cv2()
+        f = filters[k] = cv2.cuda.createGaussianFilter(cv2.CV_8UC4, cv2.CV_8UC4, (k, k), 0)
+    return f
+
+
+def _blur_roi(roi: np.ndarray, k: int, accel: str) -> np.ndarray:
+    cv2 = load_cv2()
+    if accel == "cuda" and k <= _CUDA_MAX_KSIZE:
+        # CUDA filters have no 3-channel 8-bit variant: go through BGRA on the device
+        gm = cv2.cuda_GpuMat()
+        gm.upload(roi)
+        bgra = cv2.cuda.cvtColor(gm, cv2.COLOR_BGR2BGRA)
+        blurred = _cuda_gauss(k).apply(bgra)
+        return cv2.cuda.cvtColor(blurred, cv2.COLOR_BGRA2BGR).download()
+    g = _gauss_1d(k)
+    if accel == "opencl":
+        return cv2.sepFilter2D(cv2.UMat(roi), -1, g, g).get()
+    return cv2.sepFilter2D(roi, -1, g, g)
+
+
+def _target(frame: np.ndarray, out: Optional[np.ndarray], inplace: bool) -> np.ndarray:
+    # Drawing destination: `frame` itself, a caller-owned scratch buffer, or a fresh copy
+    if inplace:
+        return frame
+    if out is None or out.shape != frame.shape or out.dtype != frame.dtype:
+        out = np.empty_like(frame)
+    np.copyto(out, frame)
+    return out
 
 
-def draw_pose(frame: np.ndarray, pose: PoseResult, color=(0, 255, 0)) -> np.ndarray:
-    out = frame.copy()
-    # Draw skeleton lines
-    for a, b in MEDIAPIPE_EDGES:
-        if a < len(pose.keypoints) and b < len(pose.keypoints):
-            pa, pb = pose.keypoints[a], pose.keypoints[b]
-            if pa.score >= 0.3 and pb.score >= 0.3:
-                cv2.line(out, (int(pa.x), int(pa.y)), (int(pb.x), int(pb.y)), color, 2, lineType=cv2.LINE_AA)
-    # Draw keypoints
-    for kp in pose.keypoints:
-        if kp.score >= 0.3:
-            cv2.circle(out, (int(kp.x), int(kp.y)), 3, color, -1, lineType=cv2.LINE_AA)
+def draw_pose(
+    frame: np.ndarray,
+    pose: PoseResult,
+    color=(0, 255, 0),
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
+) -> np.ndarray:
+    cv2 = load_cv2()
+    out = _target(frame, out, inplace)
+    mask = pose.kp_score >= 0.3
+    # Draw skeleton lines (edges whose both endpoints are confident) in one call
+    if len(mask) > _EDGES_MAX:
+        edges = _EDGES_NP[mask[_EDGES_A] & mask[_EDGES_B]]
+    else:
+        edges = _EDGES_NP[(_EDGES_NP < len(mask)).all(axis=1)]
+        edges = edges[mask[edges[:, 0]] & mask[edges[:, 1]]]
+    if len(edges):
+        segs = np.ascontiguousarray(pose.xy[edges], dtype=np.int32)  # (V, 2, 2)
+        cv2.polylines(out, list(segs), False, color, 2, lineType=cv2.LINE_AA)
+    # Draw keypoints (confident ones only)
+    for p in pose.xy[mask].tolist():
+        cv2.circle(out, tuple(p), 3, color, -1, lineType=cv2.LINE_AA)
     # Draw bounding box
     x, y, w, h = pose.bbox
     cv2.rectangle(out, (x, y), (x + w, y + h), (0, 200, 0), 2)
     return out
 
-def draw_hud_text(img: np.ndarray, lines, origin=(10, 20), color=(255, 255, 255)) -> np.ndarray:
-    out = img.copy()
+def draw_hud_text(
+    img: np.ndarray,
+    lines,
+    origin=(10, 20),
+    color=(255, 255, 255),
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
+) -> np.ndarray:
+    cv2 = load_cv2()
+    out = _target(img, out, inplace)
     x, y = origin
     for i, text in enumerate(lines):
         yy = y + i * 18
@@ -47,18 +221,36 @@ def draw_hud_text(img: np.ndarray, lines, origin=(10, 20), color=(255, 255, 255)
     return out
 
 
-def face_blur(frame: np.ndarray, kernel: int = 31) -> np.ndarray:
-    # Haar cascade based
-    cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    face_cascade = cv2.CascadeClassifier(cascade_path)
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, 1.2, 5)
-    out = frame.copy()
+def face_blur(
+    frame: np.ndarray,
+    kernel: int = 31,
+    gray: Optional[np.ndarray] = None,
+    dnn_model: str = "",
+    dnn_config: str = "",
+    dnn_conf_th: float = 0.5,
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
+    faces: Optional[List[Tuple[int, int, int, int]]] = None,
+    accel: str = "cpu",
+) -> np.ndarray:
+    # Blurs `faces` (x, y, w, h) if given; otherwise detects them: DNN (SSD-ResNet on a
+    # 320x240 downscale) when a model is given, else Haar cascade.
+    # Pass `gray` if the caller already has a grayscale frame (Haar only).
+    # accel: "cpu" | "opencl" (UMat: Haar detection + blur) | "cuda" (blur), see resolve_accel.
+    cv2 = load_cv2()
+    accel = resolve_accel(accel)
+    if faces is None:
+        if dnn_model:
+            faces = _detect_faces_dnn(frame, dnn_model, dnn_config, dnn_conf_th, accel)
+        else:
+            if gray is None:
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = _face_cascade().detectMultiScale(cv2.UMat(gray) if accel == "opencl" else gray, 1.2, 5)
+    out = _target(frame, out, inplace)
     for (x, y, w, h) in faces:
         roi = out[y : y + h, x : x + w]
         if roi.size == 0:
             continue
         k = max(3, kernel | 1)  # ensure odd
-        roi = cv2.GaussianBlur(roi, (k, k), 0)
-        out[y : y + h, x : x + w] = roi
+        out[y : y + h, x : x + w] = _blur_roi(roi, k, accel)
     return out
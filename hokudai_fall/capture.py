@@ -1,36 +1,81 @@
 from __future__ import annotations
 
+import datetime as dt
+import logging
+import os
 import threading
 import time
 from collections import deque
 from dataclasses import dataclass
-from typing import Deque, Optional
+from typing import TYPE_CHECKING, Any, Deque, List, Optional, Tuple
 
-import cv2
+import numpy as np
 
 from .config import CameraConfig
-from .utils import iso_utc, utc_now
+from .utils import load_cv2, utc_from_ns
 
+if TYPE_CHECKING:
+    import cv2
 
-@dataclass
+
+_MAX_READ_BACKOFF = 0.5  # seconds
+_MAX_DRAIN_GRABS = 8  # bound on stale frames skipped per read on live sources
+# Only the newest frame is kept (latest() hands out copies); plus one slot being decoded into
+_RING_LEN = 1
+_LIVE_PREFIXES = ("rtsp://", "rtsps://", "http://", "https://", "udp://", "tcp://", "/dev/video")
+
+
+def _is_live_source(src: Any) -> bool:
+    # Cameras and network streams queue frames in the driver; files must be read in order
+    if isinstance(src, int):
+        return True
+    return str(src).strip().lower().startswith(_LIVE_PREFIXES)
+
+
+@dataclass(slots=True)
 class FrameRecord:
-    ts_utc: str
-    frame: any  # numpy.ndarray
+    ts_ns: int  # capture time, epoch ns (time.time_ns()); format only when persisted
+    # Records from latest()/request_frame() own their frame; inside CaptureThread it is a view
+    # of a capture slot that the next frames are decoded into. Never draw on it in place.
+    frame: np.ndarray
     index: int
 
+    def detach(self) -> FrameRecord:
+        # Same record with its own copy of the frame, independent of the capture ring
+        return FrameRecord(ts_ns=self.ts_ns, frame=self.frame.copy(), index=self.index)
+
+    @property
+    def ts_dt(self) -> dt.datetime:
+        return utc_from_ns(self.ts_ns)
+
 
 class CaptureThread:
-    def __init__(self, cfg: CameraConfig, ring_seconds: float = 6.0) -> None:
+    def __init__(self, cfg: CameraConfig) -> None:
         self.cfg = cfg
-        self.ring_seconds = ring_seconds
         self.cap: Optional[cv2.VideoCapture] = None
         self.thread: Optional[threading.Thread] = None
         self.stop_flag = threading.Event()
-        # up to ring_seconds * fps frames
-        self.ring: Deque[FrameRecord] = deque(maxlen=int(cfg.fps * ring_seconds))
+        self.ring: Deque[FrameRecord] = deque(maxlen=_RING_LEN)
+        # Preallocated frame buffers decoded into in turn (one more than the ring, so the
+        # slot being written is never one a FrameRecord in the ring still points to)
+        self._slots: List[np.ndarray] = []
+        self._slot_i = 0
+        # Held while picking the next slot and while latest() copies a frame out, so a slot
+        # can't start being decoded into while its frame is being copied
+        self._slot_lock = threading.Lock()
         self._index = 0
+        self._consec_fail = 0  # consecutive failed reads (drives the retry backoff)
+        self._backoff_warned = False
+        self._live = False
+        self._period_ns = int(1e9 / max(cfg.fps, 1))
+        self._src_period_ns = self._period_ns  # source's own frame interval (set in start)
+        # on-demand handshake: request_frame() sets _want, the thread answers via _served/_ready
+        self._want = threading.Event()
+        self._ready = threading.Event()
+        self._served: Optional[FrameRecord] = None
 
     def start(self) -> None:
+        cv2 = load_cv2()
         src = self.cfg.source
         # Accept both numeric (int) and string values (e.g., "0", "rtsp://...", file path)
         if isinstance(src, int):
@@ -39,6 +84,10 @@ class CaptureThread:
             src_any = int(src.strip())
         else:
             src_any = src
+        if self.cfg.rtsp_transport and str(src_any).lower().startswith(("rtsp://", "rtsps://")):
+            # Opt-in: FFmpeg reads this at open time (unset = FFmpeg's default, TCP).
+            # An explicitly exported value wins.
+            os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", f"rtsp_transport;{self.cfg.rtsp_transport}")
         cap = cv2.VideoCapture(src_any)
         if self.cfg.width:
             cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.cfg.width)
@@ -49,37 +98,143 @@ class CaptureThread:
 
         if not cap.isOpened():
             raise RuntimeError(f"Failed to open camera source: {src}")
+        # Keep at most one frame queued in the driver (ignored by backends without support)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
+        self._live = _is_live_source(src_any)
+        # The source may deliver faster than camera.fps (e.g. RTSP ignores CAP_PROP_FPS);
+        # the drain in _read_latest must go by the rate frames actually arrive at
+        src_fps = cap.get(cv2.CAP_PROP_FPS)
+        if 0 < src_fps <= 1000:
+            self._src_period_ns = int(1e9 / src_fps)
         self.cap = cap
         self.stop_flag.clear()
         self.thread = threading.Thread(target=self._run, name="capture_thread", daemon=True)
         self.thread.start()
 
+    def _on_read_failure(self) -> None:
+        # exponential backoff: recover fast from a transient RTSP hiccup,
+        # but don't spin on a dead source
+        backoff = min(_MAX_READ_BACKOFF, 0.01 * 2 ** min(self._consec_fail, 16))
+        self._consec_fail += 1
+        if backoff >= _MAX_READ_BACKOFF and not self._backoff_warned:
+            logging.warning("Camera read keeps failing (%d attempts); retrying every %.1fs", self._consec_fail, backoff)
+            self._backoff_warned = True
+        time.sleep(backoff)
+
+    def _next_slot(self) -> Optional[np.ndarray]:
+        # The free slot (no ring record points to it). Only a successful read (_adopt) moves
+        # on, so failed reads keep retrying into the same free slot.
+        if not self._slots:
+            return None  # first frame: let OpenCV allocate, then size the slots from it
+        with self._slot_lock:
+            return self._slots[self._slot_i]
+
+    def _adopt(self, frame: np.ndarray, slot: Optional[np.ndarray]) -> None:
+        # OpenCV returns a new array instead of filling `slot` when the size differs
+        # (first frame, or the source changed resolution): (re)build the slots to match
+        if slot is not None and frame is slot:
+            self._slot_i = (self._slot_i + 1) % len(self._slots)
+            return
+        if not self._slots or self._slots[0].shape != frame.shape:
+            n = (self.ring.maxlen or 1) + 1
+            self._slots = [np.empty_like(frame) for _ in range(n)]
+            self._slots[0] = frame
+            self._slot_i = 1 % n
+
+    def _store(self, frame: np.ndarray) -> FrameRecord:
+        self._consec_fail = 0
+        self._backoff_warned = False
+        self._index += 1
+        rec = FrameRecord(ts_ns=time.time_ns(), frame=frame, index=self._index)
+        self.ring.append(rec)
+        return rec
+
     def _run(self) -> None:
         assert self.cap is not None
         cap = self.cap
-        target_delay = 1.0 / max(self.cfg.fps, 1)
+        if self.cfg.on_demand:
+            self._run_on_demand(cap)
+            return
+        # Absolute-deadline pacing on the monotonic clock: no drift from re-baselining
+        # each loop and immune to wall-clock jumps
+        period_ns = self._period_ns
+        next_deadline = time.monotonic_ns()
         while not self.stop_flag.is_set():
-            start = time.time()
-            ok, frame = cap.read()
+            slot = self._next_slot()
+            ok, frame = self._read_latest(cap, slot)
             if not ok:
-                # brief backoff and retry
-                time.sleep(0.3)
+                self._on_read_failure()
+                next_deadline = time.monotonic_ns()
                 continue
-            self._index += 1
-            self.ring.append(
-                FrameRecord(ts_utc=iso_utc(utc_now()), frame=frame, index=self._index)
-            )
-            elapsed = time.time() - start
-            delay = max(0.0, target_delay - elapsed)
-            if delay > 0:
-                time.sleep(delay)
+            self._adopt(frame, slot)
+            self._store(frame)
+            next_deadline += period_ns
+            sleep_ns = next_deadline - time.monotonic_ns()
+            if sleep_ns > 0:
+                time.sleep(sleep_ns / 1e9)
+            else:
+                # fell behind: drop the missed slots instead of bursting to catch up
+                next_deadline = time.monotonic_ns()
 
-    def latest(self) -> Optional[FrameRecord]:
-        try:
-            return self.ring[-1]
-        except IndexError:
+    def _run_on_demand(self, cap: cv2.VideoCapture) -> None:
+        # Idle until the inference loop asks, then fetch exactly one (drained, newest) frame.
+        # Nothing is captured while pose runs, so no frame ages in our queue.
+        while not self.stop_flag.is_set():
+            if not self._want.wait(timeout=0.1):
+                continue
+            self._want.clear()
+            slot = self._next_slot()
+            ok, frame = self._read_latest(cap, slot)
+            if ok:
+                self._adopt(frame, slot)
+            self._served = self._store(frame) if ok else None
+            self._ready.set()
+            if not ok:
+                self._on_read_failure()
+
+    def _read_latest(self, cap: cv2.VideoCapture, dst: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        # Decodes into `dst` when it has the right size (no per-frame allocation)
+        if not self._live:
+            return cap.read(dst)
+        # grab() until one actually waits for the sensor: a grab that returns well within a
+        # source frame interval came out of the driver queue and is already stale. Decode only
+        # that last one. Once a whole interval has gone by the last grab is fresh either way.
+        period = self._src_period_ns
+        half_period = period // 2
+        grabbed = False
+        start = time.monotonic_ns()
+        for _ in range(_MAX_DRAIN_GRABS):
+            t0 = time.monotonic_ns()
+            if not cap.grab():
+                break
+            grabbed = True
+            t1 = time.monotonic_ns()
+            if t1 - t0 >= half_period or t1 - start >= period:
+                break
+        if not grabbed:
+            return False, None
+        return cap.retrieve(dst)
+
+    def request_frame(self, timeout: float = 1.0) -> Optional[FrameRecord]:
+        # on_demand mode: capture a fresh frame now and wait for it (None on failure/timeout)
+        if not self.cfg.on_demand:
+            return self.latest()
+        self._ready.clear()
+        self._want.set()
+        if not self._ready.wait(timeout):
             return None
+        # nothing is decoded until the next request, so the served slot is stable here
+        served = self._served
+        return served.detach() if served is not None else None
+
+    def latest(self) -> Optional[FrameRecord]:
+        # Newest frame, copied out of its capture slot (the slot is reused a frame later)
+        with self._slot_lock:
+            try:
+                return self.ring[-1].detach()
+            except IndexError:
+                return None
 
     def stop(self) -> None:
         self.stop_flag.set()
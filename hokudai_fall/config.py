@@ -7,6 +7,12 @@ from typing import Any, Dict, Optional
 
 import yaml
 
+try:
+    # LibYAML-backed loader; much faster than the pure-Python one
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
+
 
 @dc.dataclass
 class CameraConfig:
@@ -16,13 +22,19 @@ class CameraConfig:
     fps: int = 30
     inference_fps: int = 12
     camera_id: str = "cam01"
+    on_demand: bool = False  # capture only when inference asks for a frame (no queued frames aging)
+    rtsp_transport: str = ""  # "" = FFmpeg default (TCP); "udp" | "tcp" to force it for rtsp:// sources
 
 
 @dc.dataclass
 class ModelConfig:
-    backend: str = "mediapipe"  # implemented: mediapipe; stubs: tflite/onnx/opencv-dnn
+    backend: str = "mediapipe"  # implemented: mediapipe, openvino; stubs: tflite/onnx/opencv-dnn
     model_path: str = ""
-    num_threads: int = 2
+    num_threads: int = 2  # OpenCV thread pool (and OpenVINO inference threads); <= 0 = library default
+    # Skip pose on frames whose mean |Δluma| vs the last inferred frame is below this (0-255 scale)
+    # and reuse the previous pose; 0 disables. At most motion_gate_max_skip frames in a row.
+    motion_gate_th: float = 0.0
+    motion_gate_max_skip: int = 6
 
 
 @dc.dataclass
@@ -57,6 +69,8 @@ class SaverConfig:
     post_seconds: float = 3.0
     image_format: str = "jpg"
     jpeg_quality: int = 90
+    max_pending: int = 4  # events waiting to be written; further events are dropped (logged) when full
+    encode_workers: int = 0  # threads for per-frame blur/draw/encode; 0 = CPU count - 1
     video_clip: VideoClipConfig = dc.field(default_factory=VideoClipConfig)
 
 
@@ -64,6 +78,14 @@ class SaverConfig:
 class PrivacyConfig:
     face_blur: bool = True
     blur_kernel: int = 31
+    # "detector": detect faces on every saved frame (default). "pose": blur the face box given by
+    # the pose landmarks, running the detector only on frames without a confident face pose
+    face_blur_mode: str = "detector"
+    face_blur_accel: str = "cpu"  # "cpu" | "opencl" | "cuda"; falls back to cpu if OpenCV lacks it
+    # Optional OpenCV DNN face detector (res10 SSD Caffe); Haar cascade is used when empty
+    face_dnn_model: str = ""  # e.g. res10_300x300_ssd_iter_140000.caffemodel
+    face_dnn_config: str = ""  # e.g. deploy.prototxt
+    face_dnn_conf_th: float = 0.5
     encrypt_at_rest: bool = False
     retention_days: int = 30
     redact_metadata: bool = True
@@ -106,12 +128,12 @@ class AppConfig:
 def load_config(path: Path) -> AppConfig:
     text = Path(path).read_text(encoding="utf-8")
     if path.suffix.lower() in {".yaml", ".yml"}:
-        data = yaml.safe_load(text)
+        data = yaml.load(text, Loader=_YamlLoader)
     elif path.suffix.lower() == ".json":
         data = json.loads(text)
     else:
         # default YAML
-        data = yaml.safe_load(text)
+        data = yaml.load(text, Loader=_YamlLoader)
 
     cfg = AppConfig.from_mapping(data or {})
 
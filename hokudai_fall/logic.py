@@ -2,17 +2,20 @@ from __future__ import annotations
 
 import math
 import time
-from collections import deque
 from dataclasses import dataclass
-from typing import Deque, Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 
+from ._fsm_kernels import drop_from_prior_min, still_score
 from .config import DetectionConfig
-from .pose import Keypoint, PoseResult
+from .pose import PoseResult
 
+# MediaPipe Pose indices: left/right shoulder, left/right hip
+_TORSO_IDX = np.array([11, 12, 23, 24])
 
-@dataclass
+
+@dataclass(slots=True)
 class Features:
     theta: float
     ratio: float
@@ -20,7 +23,7 @@ class Features:
     h_person: float
 
 
-@dataclass
+@dataclass(slots=True)
 class TriggerSnapshot:
     theta_max: float
     ratio_min: float
@@ -32,33 +35,81 @@ class FallLogicFSM:
     def __init__(self, cfg: DetectionConfig, inference_fps: float):
         self.cfg = cfg
         self.infer_fps = inference_fps
-        self.history: Deque[Features] = deque(maxlen=int(max(3, (cfg.T_pose_sec + cfg.T_still_sec + cfg.T_drop_sec) * inference_fps + 5)))
+        # Window lengths in inference frames (fixed for the run)
+        fps = max(inference_fps, 1.0)
+        self.n_pose = int(cfg.T_pose_sec * fps)
+        self.n_drop = int(cfg.T_drop_sec * fps)
+        self.n_still = int(cfg.T_still_sec * fps)
+        # Feature history as parallel ring buffers (SoA); read windows via _last()
+        self._maxlen = int(max(3, (cfg.T_pose_sec + cfg.T_still_sec + cfg.T_drop_sec) * inference_fps + 5))
+        self._theta = np.empty(self._maxlen, dtype=np.float32)
+        self._ratio = np.empty(self._maxlen, dtype=np.float32)
+        self._hip_y = np.empty(self._maxlen, dtype=np.float32)
+        self._h_person = np.empty(self._maxlen, dtype=np.float32)
+        self._head = 0  # next write position
+        self._n = 0  # valid entries (<= maxlen)
+        self._count = 0  # total features appended so far (not capped by maxlen)
         self.cooldown_until: float = 0.0
         # Bridge A∧B to C with a grace window
         self.state: str = "idle"  # "idle" | "await_still"
-        self.prelim_hist_len: int = 0
+        self.prelim_count: int = 0
         self.still_deadline: float = 0.0
         self._pre_theta_max: float = 0.0
         self._pre_ratio_min: float = 1e9
         self._pre_hip_drop: float = 0.0
 
-    @staticmethod
-    def _center(a: Keypoint, b: Keypoint) -> Tuple[float, float]:
-        return (0.5 * (a.x + b.x), 0.5 * (a.y + b.y))
+    @property
+    def history_len(self) -> int:
+        return self._n
+
+    def _append(self, ft: Features) -> None:
+        i = self._head
+        self._theta[i] = ft.theta
+        self._ratio[i] = ft.ratio
+        self._hip_y[i] = ft.hip_y
+        self._h_person[i] = ft.h_person
+        self._head = (i + 1) % self._maxlen
+        self._n = min(self._n + 1, self._maxlen)
+        self._count += 1
+
+    def _last(self, buf: np.ndarray, n: int) -> np.ndarray:
+        # Most recent n entries of a ring buffer, oldest first (a view unless it wraps)
+        n = min(n, self._n)
+        start = self._head - n
+        if start >= 0:
+            return buf[start : self._head]
+        return np.concatenate((buf[start:], buf[: self._head]))
+
+    # Window checks shared by update() and the debug HUD; all operate on ring-buffer views
+
+    def posture_held(self, n_pose: int) -> bool:
+        # A: theta>th or ratio<th on every one of the last n_pose features
+        if self._n < n_pose:
+            return False
+        theta_win = self._last(self._theta, n_pose)
+        ratio_win = self._last(self._ratio, n_pose)
+        return bool(np.logical_or(theta_win > self.cfg.angle_deg_th, ratio_win < self.cfg.ratio_th).all())
+
+    def hip_drop(self, n_drop: int) -> float:
+        # B: current hip_y minus the minimum hip_y in the last n_drop features (excluding current)
+        if self._n < 2:
+            return 0.0
+        return drop_from_prior_min(self._last(self._hip_y, max(2, min(self._n, n_drop + 1))))
+
+    def stillness(self, n: int) -> Tuple[float, bool]:
+        # C: (80th percentile of |Δhip_y|, still?) over the last n features
+        q80, _, still = still_score(self._last(self._hip_y, n), float(self.cfg.v_still_px_per_frame))
+        return (q80, still)
 
     def _compute_features(self, pose: PoseResult) -> Optional[Features]:
-        kps = pose.keypoints
-        # MediaPipe indices for shoulders and hips
-        # Left shoulder: 11, Right shoulder: 12, Left hip: 23, Right hip: 24 in MediaPipe Pose
-        try:
-            ls, rs, lh, rh = kps[11], kps[12], kps[23], kps[24]
-        except IndexError:
+        if len(pose.kp_score) <= _TORSO_IDX[-1]:
             return None
-        if min(ls.score, rs.score, lh.score, rh.score) < 0.2:
+        if pose.kp_score[_TORSO_IDX].min() < 0.2:
             return None
 
-        scx, scy = self._center(ls, rs)
-        hcx, hcy = self._center(lh, rh)
+        (lsx, lsy), (rsx, rsy), (lhx, lhy), (rhx, rhy) = pose.xy[_TORSO_IDX].tolist()
+        scx, scy = 0.5 * (lsx + rsx), 0.5 * (lsy + rsy)
+        hcx, hcy = 0.5 * (lhx + rhx), 0.5 * (lhy + rhy)
         vx, vy = (hcx - scx), (hcy - scy)
         # angle between body vector and vertical (0 deg = upright)
         angle = abs(math.degrees(math.atan2(vx, vy)))  # swap to measure from vertical
@@ -76,7 +127,7 @@ class FallLogicFSM:
             if pose is not None:
                 ft = self._compute_features(pose)
                 if ft:
-                    self.history.append(ft)
+                    self._append(ft)
             return (False, None)
 
         if pose is None:
@@ -85,64 +136,40 @@ class FallLogicFSM:
         ft = self._compute_features(pose)
         if not ft:
             return (False, None)
-        self.history.append(ft)
+        self._append(ft)
 
         cfg = self.cfg
-        fps = max(self.infer_fps, 1.0)
 
         # A: posture sustained (theta>th or ratio<th) for T_pose
-        n_pose = int(cfg.T_pose_sec * fps)
-        A = False
-        if len(self.history) >= n_pose:
-            last = list(self.history)[-n_pose:]
-            A = all((f.theta > cfg.angle_deg_th) or (f.ratio < cfg.ratio_th) for f in last)
+        A = self.posture_held(self.n_pose)
 
         # B: hip drop within T_drop
-        n_drop = int(cfg.T_drop_sec * fps)
-        B = False
-        hip_drop = 0.0
-        if len(self.history) >= 2:
-            # Consider any rapid drop within the last T_drop window.
-            # Compute drop as current hip_y minus the minimum hip_y observed in the window (excluding current).
-            window_len = max(2, min(len(self.history), n_drop + 1))
-            window = list(self.history)[-window_len:]
-            cur = window[-1]
-            prior_min = min(f.hip_y for f in window[:-1])
-            hip_drop = float(cur.hip_y - prior_min)
-            B = hip_drop > cfg.hip_drop_px_th
+        hip_drop = self.hip_drop(self.n_drop)
+        B = hip_drop > cfg.hip_drop_px_th
 
         # D: min person height (current)
-        D = self.history[-1].h_person >= cfg.min_person_height_px
+        D = float(self._h_person[self._head - 1]) >= cfg.min_person_height_px
 
         # Bridged FSM: when A∧B∧D is first observed, enter await_still; allow up to T_still + C_grace to satisfy stillness
-        n_still = int(cfg.T_still_sec * fps)
+        n_still = self.n_still
         still_score = 999.0
 
         if self.state == "idle":
             if A and B and D:
                 self.state = "await_still"
-                self.prelim_hist_len = len(self.history)
+                self.prelim_count = self._count
                 self.still_deadline = now + cfg.T_still_sec + getattr(cfg, "C_grace_sec", 0.6)
-                self._pre_theta_max = max(f.theta for f in self.history)
-                self._pre_ratio_min = min(f.ratio for f in self.history)
+                self._pre_theta_max = float(self._last(self._theta, self._n).max())
+                self._pre_ratio_min = float(self._last(self._ratio, self._n).min())
                 self._pre_hip_drop = hip_drop
                 return (False, None)
             return (False, None)
 
         if self.state == "await_still":
-            since = len(self.history) - self.prelim_hist_len
+            # counted in appends, so the window keeps growing once the ring is full
+            since = self._count - self.prelim_count
             if since >= n_still:
-                window = list(self.history)[-since:]
-                seg = window[-n_still - 1 :]
-                diffs = [abs(seg[i + 1].hip_y - seg[i].hip_y) for i in range(len(seg) - 1)]
-                if diffs:
-                    q80 = float(np.percentile(diffs, 80))
-                    frac_ok = float(np.mean([d <= cfg.v_still_px_per_frame for d in diffs]))
-                    still_score = q80
-                    C = (q80 < cfg.v_still_px_per_frame * 1.2) and (frac_ok >= 0.7)
-                else:
-                    still_score = 0.0
-                    C = True
+                still_score, C = self.stillness(min(since, n_still + 1))
                 if C and D:
                     self.cooldown_until = now + cfg.cooldown_sec
                     snap = TriggerSnapshot(
@@ -6,19 +6,20 @@ import os
 import sys
 import time
 from collections import deque
+from itertools import chain, islice
 from pathlib import Path
 from typing import Deque, List, Optional
 
-import cv2
 import numpy as np
 
 from .capture import CaptureThread, FrameRecord
 from .config import AppConfig, load_config
 from .logic import FallLogicFSM
-from .pose import PoseResult, build_estimator
+from .pipeline import PoseWorker
+from .pose import MotionGate, PoseResult, build_estimator
 from .saver import CompletedEvent, FrameToSave, SaverWorker
-from .utils import event_id, host_name, iso_utc, utc_now
-from .annotate import draw_pose, draw_hud_text
+from .utils import event_id, host_name, load_cv2
+from .warmup import warmup_kernels
 
 
 APP_VERSION = "0.9.0"
@@ -72,9 +73,15 @@ def main(argv: Optional[List[str]] = None) -> int:
     setup_logging(cfg.logging.level, cfg.logging.file)
 
     logging.info("Starting Fall Detector %s (config=%s)", APP_VERSION, cfg_path)
+    cv2 = load_cv2()
+
+    # Cap OpenCV's internal thread pool: capture, pose and the saver's encode pool already run
+    # in parallel, and each cv2 call fanning out to every core oversubscribes the CPU
+    if cfg.model.num_threads > 0:
+        cv2.setNumThreads(cfg.model.num_threads)
 
     # Capture thread
-    cap = CaptureThread(cfg.camera, ring_seconds=max(6.0, cfg.saver.pre_seconds + cfg.saver.post_seconds + 2))
+    cap = CaptureThread(cfg.camera)
     try:
         cap.start()
     except Exception as e:
@@ -84,7 +91,7 @@ def main(argv: Optional[List[str]] = None) -> int:
 
     # Pose estimator
     try:
-        estimator = build_estimator(cfg.model.backend)
+        estimator = build_estimator(cfg.model.backend, model_path=cfg.model.model_path, num_threads=cfg.model.num_threads)
     except SystemExit as e:
         logging.error("Model backend '%s' not implemented or failed to load (exit %s)", cfg.model.backend, e.code)
         return int(e.code or 101)
@@ -95,36 +102,47 @@ def main(argv: Optional[List[str]] = None) -> int:
     # Logic FSM
     infer_fps = cfg.camera.inference_fps
     fsm = FallLogicFSM(cfg.detection, inference_fps=infer_fps)
+    warmup_kernels()
 
     # Saver worker
-    saver = SaverWorker()
+    saver = SaverWorker(max_pending=cfg.saver.max_pending, encode_workers=cfg.saver.encode_workers)
 
     # Inference frame history (for pre/post collection)
     hist: Deque[tuple[FrameRecord, Optional[PoseResult]]] = deque(maxlen=int(cfg.saver.pre_seconds * infer_fps * 2 + 20))
+    # Per-run constants (in inference frames / ms), hoisted out of the loop
+    need_pre = int(cfg.saver.pre_seconds * infer_fps)
+    need_post = int(cfg.saver.post_seconds * infer_fps)
+    frame_ms = 1000.0 / max(1, infer_fps)
 
     seq = 1
     collecting = None  # type: Optional[dict]
-    next_infer_time = time.time()
+
+    # Display scratch buffers: FrameRecord.frame is shared with the event history and
+    # must not be drawn on, so the HUD is composed into one of these (reused per tick)
+    disp_pool: List[Optional[np.ndarray]] = [None, None]
+    disp_slot = 0
+    if args.display:
+        from .annotate import draw_hud_text, draw_pose
 
     fps_counter = 0
     fps_t0 = time.time()
     fps_val = 0.0
     last_status = "idle"
+
+    # Frame fetch + pose inference run on their own thread; this loop consumes the results
+    gate = MotionGate(cfg.model.motion_gate_th, max_skip=cfg.model.motion_gate_max_skip)
+    pose_worker = PoseWorker(cap, estimator, gate, infer_fps, on_demand=cfg.camera.on_demand)
+    pose_worker.start()
+    rc = 0
     try:
         while True:
-            lr = cap.latest()
-            if lr is None:
-                time.sleep(0.01)
+            item = pose_worker.get(timeout=1.0)
+            if item is None:
+                if pose_worker.failed:
+                    rc = 101
+                    break
                 continue
-
-            # keep inference rate
-            now = time.time()
-            if now < next_infer_time:
-                time.sleep(max(0.0, next_infer_time - now))
-            next_infer_time = time.time() + (1.0 / max(1, infer_fps))
-
-            # Run pose estimation on latest frame
-            pose = estimator.estimate(lr.frame)
+            lr, pose = item
             hist.append((lr, pose))
             fps_counter += 1
             if time.time() - fps_t0 >= 1.0:
@@ -137,17 +155,21 @@ def main(argv: Optional[List[str]] = None) -> int:
                 collecting["frames"].append((lr, pose))
                 if len(collecting["frames"]) >= collecting["need_post"]:
                     # finalize event and enqueue for saving
-                    ev_frames: List[FrameToSave] = []
-                    t0 = collecting["t0_ts"]
                     # pre frames (already in collecting["pre"]) + frames collected (includes the trigger frame as first)
-                    for (fr, po) in collecting["pre"] + collecting["frames"]:
-                        # compute relative ms from t0
-                        t_rel_ms = int((fr.index - t0[1]) * (1000.0 / max(1, infer_fps)))
-                        ev_frames.append(FrameToSave(frame=fr.frame, t_rel_ms=t_rel_ms, pose=po))
+                    pre, post = collecting["pre"], collecting["frames"]
+                    n_ev = len(pre) + len(post)
+                    # relative ms from the trigger frame, all at once (astype truncates like int())
+                    indices = np.fromiter((fr.index for fr, _ in chain(pre, post)), dtype=np.int64, count=n_ev)
+                    t_rel = ((indices - collecting["t0_index"]) * frame_ms).astype(np.int64).tolist()
+                    # frames are owned copies (CaptureThread.latest/request_frame), not capture slots
+                    ev_frames: List[FrameToSave] = [
+                        FrameToSave(frame=fr.frame, t_rel_ms=t, pose=po)
+                        for (fr, po), t in zip(chain(pre, post), t_rel)
+                    ]
 
                     ev = CompletedEvent(
                         event_id=collecting["event_id"],
-                        ts_utc=collecting["ts_utc"],
+                        ts_dt=collecting["ts_dt"],
                         camera_id=cfg.camera.camera_id,
                         frames=ev_frames,
                         features=collecting["features"],
@@ -165,8 +187,8 @@ def main(argv: Optional[List[str]] = None) -> int:
                         app_version=APP_VERSION,
                         git_commit=os.getenv("GIT_COMMIT", ""),
                     )
-                    saver.submit(ev)
-                    logging.info("Event queued: %s (frames=%d)", collecting["event_id"], len(ev_frames))
+                    if saver.submit(ev):
+                        logging.info("Event queued: %s (frames=%d)", collecting["event_id"], len(ev_frames))
                     collecting = None
 
             # If not collecting, evaluate FSM for trigger
@@ -174,14 +196,11 @@ def main(argv: Optional[List[str]] = None) -> int:
                 triggered, snap = fsm.update(pose)
                 if triggered and snap is not None:
                     # build event
-                    ev_id = event_id(cfg.camera.camera_id, seq)
+                    ts_dt = lr.ts_dt
+                    ev_id = event_id(cfg.camera.camera_id, seq, ts_dt)
                     seq += 1
-                    ts_utc = lr.ts_utc
-                    # collect pre-frames from history covering pre_seconds
-                    need_pre = int(cfg.saver.pre_seconds * infer_fps)
-                    pre_list = list(hist)[-need_pre:]
-                    # post frames to collect
-                    need_post = int(cfg.saver.post_seconds * infer_fps)
+                    # collect pre-frames from history covering pre_seconds (tail only, no full copy)
+                    pre_list = list(islice(hist, max(0, len(hist) - need_pre), None))
                     features = {
                         "angle_deg_th": float(cfg.detection.angle_deg_th),
                         "ratio_th": float(cfg.detection.ratio_th),
@@ -201,8 +220,8 @@ def main(argv: Optional[List[str]] = None) -> int:
                     }
                     collecting = {
                         "event_id": ev_id,
-                        "ts_utc": ts_utc,
-                        "t0_ts": (ts_utc, lr.index),
+                        "ts_dt": ts_dt,
+                        "t0_index": lr.index,
                         "pre": pre_list,
                         "frames": [],
                         "need_post": need_post,
@@ -213,50 +232,36 @@ def main(argv: Optional[List[str]] = None) -> int:
 
             # Display (debug)
             if args.display:
-                disp = lr.frame.copy()
+                disp = disp_pool[disp_slot]
+                if disp is None or disp.shape != lr.frame.shape:
+                    disp = disp_pool[disp_slot] = np.empty_like(lr.frame)
+                disp_slot ^= 1
+                np.copyto(disp, lr.frame)
                 lines = []
                 now_ts = time.time()
                 cooldown_left = max(0.0, fsm.cooldown_until - now_ts)
                 state = getattr(fsm, "state", "idle")
                 still_left = max(0.0, getattr(fsm, "still_deadline", 0.0) - now_ts) if state == "await_still" else 0.0
                 if pose is not None:
-                    disp = draw_pose(disp, pose)
+                    draw_pose(disp, pose, inplace=True)
                     # compute quick features for HUD
                     try:
                         ft = fsm._compute_features(pose)  # type: ignore[attr-defined]
                     except Exception:
                         ft = None
-                    # Hip drop and stillness over windows
+                    # Hip drop and stillness over windows (same vectorized checks as the FSM)
                     B = False; hip_drop = 0.0
                     C = False; still_score = 0.0
                     A = False; D = False
                     if ft is not None:
                         # A
-                        n_pose = int(cfg.detection.T_pose_sec * infer_fps)
-                        if len(fsm.history) >= n_pose:
-                            lastf = list(fsm.history)[-n_pose:]
-                            A = all((f.theta > cfg.detection.angle_deg_th) or (f.ratio < cfg.detection.ratio_th) for f in lastf)
+                        A = fsm.posture_held(fsm.n_pose)
                         # B
-                        n_drop = int(cfg.detection.T_drop_sec * infer_fps)
-                        if len(fsm.history) >= 2:
-                            window_len = max(2, min(len(fsm.history), n_drop + 1))
-                            window = list(fsm.history)[-window_len:]
-                            prior_min = min(f.hip_y for f in window[:-1])
-                            hip_drop = float(window[-1].hip_y - prior_min)
-                            B = hip_drop > cfg.detection.hip_drop_px_th
+                        hip_drop = fsm.hip_drop(fsm.n_drop)
+                        B = hip_drop > cfg.detection.hip_drop_px_th
                         # C
-                        n_still = int(cfg.detection.T_still_sec * infer_fps)
-                        if len(fsm.history) >= n_still + 1:
-                            seg = list(fsm.history)[-n_still - 1 :]
-                            diffs = [abs(seg[i + 1].hip_y - seg[i].hip_y) for i in range(len(seg) - 1)]
-                            if diffs:
-                                q80 = float(np.percentile(diffs, 80))
-                                frac_ok = float(np.mean([d <= cfg.detection.v_still_px_per_frame for d in diffs]))
-                                still_score = q80
-                                C = (q80 < cfg.detection.v_still_px_per_frame * 1.2) and (frac_ok >= 0.7)
-                            else:
-                                still_score = 0.0
-                                C = True
+                        if fsm.history_len >= fsm.n_still + 1:
+                            still_score, C = fsm.stillness(fsm.n_still + 1)
                         # D
                         D = ft.h_person >= cfg.detection.min_person_height_px
                         lines += [
@@ -264,7 +269,7 @@ def main(argv: Optional[List[str]] = None) -> int:
                             f"A={A} B={B} C={C} D={D} | state={state} cooldown={cooldown_left:.1f}s still_wait={still_left:.1f}s",
                         ]
                 lines.insert(0, f"infer_fps={fps_val:.1f}")
-                disp = draw_hud_text(disp, lines)
+                draw_hud_text(disp, lines, inplace=True)
                 cv2.imshow("FallDetector", disp)
                 if cv2.waitKey(1) & 0xFF == ord("q"):
                     break
@@ -272,6 +277,10 @@ def main(argv: Optional[List[str]] = None) -> int:
     except KeyboardInterrupt:
         pass
     finally:
+        try:
+            pose_worker.stop()
+        except Exception:
+            pass
         try:
             saver.stop()
         except Exception:
@@ -284,4 +293,4 @@ def main(argv: Optional[List[str]] = None) -> int:
             cv2.destroyAllWindows()
         except Exception:
             pass
-    return 0
+    return rc
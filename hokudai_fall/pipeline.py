@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Optional, Tuple
+
+from .capture import CaptureThread, FrameRecord
+from .pose import MotionGate, PoseEstimator, PoseResult
+
+
+PoseItem = Tuple[FrameRecord, Optional[PoseResult]]
+
+
+class PoseWorker:
+    # Fetches frames at inference_fps and runs pose on its own thread, handing (frame, pose)
+    # pairs to the main loop, so FSM / event assembly / HUD overlap with the next inference.
+    # A single worker on purpose: MediaPipe's tracker is stateful and needs frames in order.
+    # The hand-off queue is short and drops its oldest item when full, so a slow consumer
+    # sees fresh frames instead of a growing backlog.
+    def __init__(
+        self,
+        cap: CaptureThread,
+        estimator: PoseEstimator,
+        gate: MotionGate,
+        inference_fps: float,
+        on_demand: bool = False,
+        maxsize: int = 2,
+    ) -> None:
+        self.cap = cap
+        self.estimator = estimator
+        self.gate = gate
+        self.infer_period = 1.0 / max(1, inference_fps)
+        self.on_demand = on_demand
+        self.queue: "queue.Queue[PoseItem]" = queue.Queue(maxsize=max(1, maxsize))
+        self.dropped = 0
+        self.failed = False
+        self.stop_flag = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="pose_worker", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def _put(self, item: PoseItem) -> None:
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self) -> None:
+        last_pose: Optional[PoseResult] = None
+        next_infer_time = time.time()
+        try:
+            while not self.stop_flag.is_set():
+                # keep inference rate; wait before fetching so the frame isn't aged by the sleep
+                now = time.time()
+                if now < next_infer_time:
+                    time.sleep(max(0.0, next_infer_time - now))
+
+                lr = self.cap.request_frame(timeout=1.0) if self.on_demand else self.cap.latest()
+                if lr is None:
+                    time.sleep(0.01)
+                    continue
+                next_infer_time = time.time() + self.infer_period
+
+                # reuse the last pose if nothing moved
+                if self.gate.should_infer(lr.frame):
+                    last_pose = self.estimator.estimate(lr.frame)
+                # lr owns its frame, so it can sit in the event history as long as needed
+                self._put((lr, last_pose))
+        except Exception:
+            logging.exception("Pose worker failed")
+            self.failed = True
+
+    def get(self, timeout: float = 1.0) -> Optional[PoseItem]:
+        # next (frame, pose) pair, or None if none arrived within timeout
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop(self) -> None:
+        self.stop_flag.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        if self.dropped:
+            logging.info("Pose worker: %d frames dropped (main loop behind inference rate)", self.dropped)
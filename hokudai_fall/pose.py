@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 
+from .utils import load_cv2
+
 
 @dataclass
 class Keypoint:
@@ -15,10 +18,23 @@ class Keypoint:
 
 @dataclass
 class PoseResult:
-    keypoints: List[Keypoint]
+    # Keypoints are stored as arrays (MediaPipe landmark order); Keypoint objects are
+    # only built if someone asks for `keypoints`
+    xy: np.ndarray = field(repr=False)  # (N, 2) int32, pixels
+    kp_score: np.ndarray = field(repr=False)  # (N,) float32
     bbox: Tuple[int, int, int, int]  # x, y, w, h of the person
     score: float
 
+    @classmethod
+    def from_keypoints(cls, keypoints: Sequence[Keypoint], bbox: Tuple[int, int, int, int], score: float) -> PoseResult:
+        xy = np.array([(kp.x, kp.y) for kp in keypoints], dtype=np.int32).reshape(-1, 2)
+        kp_score = np.array([kp.score for kp in keypoints], dtype=np.float32)
+        return cls(xy=xy, kp_score=kp_score, bbox=bbox, score=score)
+
+    @cached_property
+    def keypoints(self) -> List[Keypoint]:
+        return [Keypoint(x=float(x), y=float(y), score=float(s)) for (x, y), s in zip(self.xy.tolist(), self.kp_score.tolist())]
+
 
 class PoseEstimator:
     def estimate(self, frame: np.ndarray) -> Optional[PoseResult]:
@@ -32,39 +48,137 @@ class MediapipePoseEstimator(PoseEstimator):
 
         self.mp_pose = mp.solutions.pose
         self.pose = self.mp_pose.Pose(static_image_mode=False, model_complexity=1)
+        # Contiguous RGB input reused across frames: a frame[:, :, ::-1] view would make
+        # MediaPipe copy into a fresh contiguous buffer on every call
+        self._rgb: Optional[np.ndarray] = None
 
     def estimate(self, frame: np.ndarray) -> Optional[PoseResult]:
-        import mediapipe as mp  # type: ignore
-
         ih, iw = frame.shape[:2]
-        rgb = frame[:, :, ::-1]
-        res = self.pose.process(rgb)
+        if self._rgb is None or self._rgb.shape != frame.shape:
+            self._rgb = np.empty_like(frame)
+        cv2 = load_cv2()
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        res = self.pose.process(self._rgb)
         if not res.pose_landmarks:
             return None
-        kps: List[Keypoint] = []
-        xs: List[int] = []
-        ys: List[int] = []
         lm = res.pose_landmarks.landmark
-        # Use a subset of landmarks (shoulders, hips, knees, etc.)
-        indices = list(range(len(lm)))
-        for i in indices:
-            p = lm[i]
-            x = int(p.x * iw)
-            y = int(p.y * ih)
-            xs.append(x)
-            ys.append(y)
-            kps.append(Keypoint(x=float(x), y=float(y), score=float(p.visibility)))
-        x0, x1 = max(0, min(xs)), min(iw - 1, max(xs))
-        y0, y1 = max(0, min(ys)), min(ih - 1, max(ys))
+        # All landmarks are kept: drawing, face ROI and the FSM index them in MediaPipe order
+        arr = np.fromiter((v for p in lm for v in (p.x, p.y, p.visibility)), dtype=np.float64, count=len(lm) * 3).reshape(-1, 3)
+        xy = (arr[:, :2] * (iw, ih)).astype(np.int32)  # truncates like int()
+        kp_score = arr[:, 2].astype(np.float32)
+        (x0, y0), (x1, y1) = xy.min(axis=0).tolist(), xy.max(axis=0).tolist()
+        x0, x1 = max(0, x0), min(iw - 1, x1)
+        y0, y1 = max(0, y0), min(ih - 1, y1)
+        bbox = (x0, y0, x1 - x0 + 1, y1 - y0 + 1)
+        score = float(kp_score.mean())
+        return PoseResult(xy=xy, kp_score=kp_score, bbox=bbox, score=score)
+
+
+class MotionGate:
+    # Cheap scene-change check in front of pose inference: mean |Δluma| on a 160x90 thumbnail
+    # against the last frame pose actually ran on. Below `threshold` the caller may reuse the
+    # previous PoseResult. After `max_skip` consecutive skips inference is forced, so the FSM
+    # keeps receiving fresh poses (e.g. while it waits for stillness). threshold <= 0 disables it.
+    def __init__(self, threshold: float, max_skip: int = 6, size: Tuple[int, int] = (160, 90)) -> None:
+        self.threshold = float(threshold)
+        self.max_skip = max(0, int(max_skip))
+        self.size = size
+        self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._ref = np.empty_like(self._gray)
+        self._diff = np.empty_like(self._gray)
+        self._have_ref = False
+        self._skipped = 0
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        if self.threshold <= 0:
+            return True
+        cv2 = load_cv2()
+        # downscale first, then convert: far less work than converting the full frame
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if self._have_ref and self._skipped < self.max_skip:
+            cv2.absdiff(self._gray, self._ref, dst=self._diff)
+            if cv2.mean(self._diff)[0] < self.threshold:
+                self._skipped += 1
+                return False
+        self._ref, self._gray = self._gray, self._ref
+        self._have_ref = True
+        self._skipped = 0
+        return True
+
+
+# COCO-17 (MoveNet output order) → MediaPipe Pose landmark index, so downstream code
+# (FSM torso joints, skeleton drawing) keeps using MediaPipe numbering
+_COCO_TO_MP = np.array([0, 2, 5, 7, 8, 11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28])
+_MP_NUM_LANDMARKS = 33
+_MIN_POSE_SCORE = 0.2  # single-pose models always output a pose; treat weak ones as "no person"
+_MIN_KP_SCORE = 0.2
+
+
+class OpenVINOPoseEstimator(PoseEstimator):
+    # MoveNet SinglePose (Lightning/Thunder) as OpenVINO IR (.xml) or ONNX, run with OpenVINO on CPU.
+    # Output [1, 1, 17, 3] = (y, x, score), normalized to the input image.
+    def __init__(self, model_path: str, num_threads: int = 2) -> None:
+        if not model_path:
+            raise ValueError("model.model_path is required for the openvino backend")
+        # lazy import
+        import openvino as ov  # type: ignore
+
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if num_threads > 0:
+            config["INFERENCE_NUM_THREADS"] = int(num_threads)
+        self.compiled = core.compile_model(model_path, "CPU", config)
+        self.request = self.compiled.create_infer_request()
+
+        port = self.compiled.input(0)
+        shape = [int(d) for d in port.get_shape()]
+        self._nchw = shape[1] == 3 and shape[-1] != 3
+        self._in_h, self._in_w = (shape[2], shape[3]) if self._nchw else (shape[1], shape[2])
+        # Input tensor shares memory with this array, so preprocessing writes straight into it
+        self._input = np.zeros(shape, dtype=port.get_element_type().to_dtype())
+        self.request.set_input_tensor(ov.Tensor(self._input, shared_memory=True))
+        self._resized = np.empty((self._in_h, self._in_w, 3), dtype=np.uint8)
+        self._rgb = np.empty_like(self._resized)
+
+    def estimate(self, frame: np.ndarray) -> Optional[PoseResult]:
+        cv2 = load_cv2()
+        ih, iw = frame.shape[:2]
+        cv2.resize(frame, (self._in_w, self._in_h), dst=self._resized, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        # MoveNet takes raw 0..255 RGB; only the dtype cast (and layout) is needed
+        src = self._rgb.transpose(2, 0, 1) if self._nchw else self._rgb
+        np.copyto(self._input[0], src, casting="unsafe")
+        self.request.infer()
+
+        out = self.request.get_output_tensor(0).data.reshape(-1, 3)[: len(_COCO_TO_MP)]
+        coco_score = out[:, 2].astype(np.float32)
+        score = float(coco_score.mean())
+        if score < _MIN_POSE_SCORE:
+            return None
+
+        xy = np.zeros((_MP_NUM_LANDMARKS, 2), dtype=np.int32)
+        kp_score = np.zeros(_MP_NUM_LANDMARKS, dtype=np.float32)  # unmapped landmarks stay at 0 (never drawn)
+        xy[_COCO_TO_MP] = (out[:, 1::-1] * (iw, ih)).astype(np.int32)  # (y, x) → (x, y) pixels
+        kp_score[_COCO_TO_MP] = coco_score
+
+        valid = xy[_COCO_TO_MP][coco_score >= _MIN_KP_SCORE]
+        if len(valid) == 0:
+            return None
+        (x0, y0), (x1, y1) = valid.min(axis=0).tolist(), valid.max(axis=0).tolist()
+        x0, x1 = max(0, x0), min(iw - 1, x1)
+        y0, y1 = max(0, y0), min(ih - 1, y1)
         bbox = (x0, y0, x1 - x0 + 1, y1 - y0 + 1)
-        score = float(np.mean([kp.score for kp in kps]))
-        return PoseResult(keypoints=kps, bbox=bbox, score=score)
+        return PoseResult(xy=xy, kp_score=kp_score, bbox=bbox, score=score)
 
 
-def build_estimator(backend: str) -> PoseEstimator:
+def build_estimator(backend: str, model_path: str = "", num_threads: int = 2) -> PoseEstimator:
     b = backend.lower()
     if b == "mediapipe":
         return MediapipePoseEstimator()
+    if b == "openvino":
+        return OpenVINOPoseEstimator(model_path, num_threads=num_threads)
     # Future: implement tflite/onnx/opencv-dnn backends
     raise SystemExit(101)
 
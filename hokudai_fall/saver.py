@@ -2,26 +2,51 @@ from __future__ import annotations
 
 import datetime as dt
 import json
+import os
+import queue
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from dataclasses import dataclass
 import logging
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
-import cv2
 import numpy as np
 
-from .annotate import draw_pose, face_blur
 from .config import PrivacyConfig, SaverConfig
 from .pose import PoseResult
 from .utils import (
     ensure_dir,
     event_dir,
+    load_cv2,
+    iso_utc,
     serialize_json,
     enforce_retention,
 )
 
 
+@lru_cache(maxsize=8)
+def _encode_params(image_format: str, jpeg_quality: int) -> Tuple[str, Tuple[int, ...]]:
+    # (extension, imencode params), built once per setting rather than per event/frame
+    if image_format.lower() == "jpg":
+        cv2 = load_cv2()
+        # optimize (extra Huffman pass) and progressive stay off explicitly: speed over a few %
+        return ".jpg", (
+            cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality),
+            cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+            cv2.IMWRITE_JPEG_PROGRESSIVE, 0,
+        )
+    return ".png", ()
+
+
+def _write_image(path: Path, img: np.ndarray, ext: str, params: Tuple[int, ...]) -> None:
+    ok, buf = load_cv2().imencode(ext, img, params)
+    if not ok:
+        raise RuntimeError(f"Failed to encode {path.name}")
+    buf.tofile(path)
+
+
 @dataclass
 class FrameToSave:
     frame: np.ndarray
@@ -32,7 +57,7 @@ class FrameToSave:
 @dataclass
 class CompletedEvent:
     event_id: str
-    ts_utc: str
+    ts_dt: dt.datetime  # trigger time (aware, UTC); formatted only for event.json
     camera_id: str
     frames: List[FrameToSave]  # includes both pre and post
     features: dict
@@ -45,35 +70,49 @@ class CompletedEvent:
     app_version: str
     git_commit: str = ""
 
+    @property
+    def ts_utc(self) -> str:
+        return iso_utc(self.ts_dt)
+
 
 class SaverWorker:
-    def __init__(self) -> None:
-        self.queue: List[CompletedEvent] = []
-        self.lock = threading.Lock()
-        self.cv = threading.Condition(self.lock)
-        self.stop_flag = False
+    def __init__(self, max_pending: int = 4, submit_timeout: float = 1.0, encode_workers: int = 0) -> None:
+        # Bounded: if the disk can't keep up, submit() applies backpressure instead of
+        # letting events (and their frames) pile up in memory. None is the stop sentinel.
+        self.queue: "queue.Queue[Optional[CompletedEvent]]" = queue.Queue(maxsize=max(1, max_pending))
+        self.submit_timeout = submit_timeout
+        # Blur/draw/JPEG encode per frame runs on this pool (OpenCV releases the GIL);
+        # by default leave one core for capture + pose inference
+        if encode_workers <= 0:
+            encode_workers = max(1, (os.cpu_count() or 2) - 1)
+        self.pool = ThreadPoolExecutor(max_workers=encode_workers, thread_name_prefix="saver_encode")
+        self._bufs = threading.local()  # per-encode-thread scratch buffers
         self.thread = threading.Thread(target=self._run, name="saver_worker", daemon=True)
         self.thread.start()
 
-    def submit(self, ev: CompletedEvent) -> None:
-        with self.cv:
-            self.queue.append(ev)
-            self.cv.notify_all()
+    def submit(self, ev: CompletedEvent) -> bool:
+        try:
+            self.queue.put(ev, timeout=self.submit_timeout)
+        except queue.Full:
+            logging.error("Saver queue full (%d pending); dropping event %s", self.queue.maxsize, ev.event_id)
+            return False
+        return True
 
     def stop(self) -> None:
-        with self.cv:
-            self.stop_flag = True
-            self.cv.notify_all()
+        # Pending events are saved first: the sentinel queues behind them
+        try:
+            self.queue.put(None, timeout=2.0)
+        except queue.Full:
+            logging.warning("Saver still busy at shutdown; unsaved events may be lost")
+            return
         self.thread.join(timeout=2.0)
+        self.pool.shutdown(wait=False)
 
     def _run(self) -> None:
         while True:
-            with self.cv:
-                while not self.queue and not self.stop_flag:
-                    self.cv.wait(timeout=0.5)
-                if self.stop_flag and not self.queue:
-                    return
-                ev = self.queue.pop(0)
+            ev = self.queue.get()
+            if ev is None:
+                return
             try:
                 self._save_event(ev)
                 logging.info("Event saved: %s", ev.event_id)
@@ -86,44 +125,43 @@ class SaverWorker:
             enforce_retention(ev.base_dir, ev.privacy.retention_days, min_free_pct=5.0)
         except Exception:
             pass
-        ts = dt.datetime.strptime(ev.ts_utc, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=dt.timezone.utc)
-        out_dir = event_dir(ev.base_dir, ev.camera_id, ev.event_id, ts)
+        out_dir = event_dir(ev.base_dir, ev.camera_id, ev.event_id, ev.ts_dt)
         ensure_dir(out_dir)
 
-        # Save frames
-        img_ext = ".jpg" if ev.saver.image_format.lower() == "jpg" else ".png"
-        params = [cv2.IMWRITE_JPEG_QUALITY, int(ev.saver.jpeg_quality)] if img_ext == ".jpg" else []
+        # The clip only reads the raw frames, so it is written alongside the stills
+        clip_job = None
+        if ev.saver.video_clip.enabled and len(ev.frames) > 1:
+            clip_job = self.pool.submit(self._write_clip, ev, out_dir)
+
+        # annotate is only imported (once per event) when blur/annotation is enabled
+        blur = face_roi = draw = None
+        if ev.privacy.face_blur:
+            from .annotate import face_blur, face_roi_from_pose
+
+            blur = partial(
+                face_blur,
+                kernel=ev.privacy.blur_kernel,
+                dnn_model=ev.privacy.face_dnn_model,
+                dnn_config=ev.privacy.face_dnn_config,
+                dnn_conf_th=ev.privacy.face_dnn_conf_th,
+                accel=ev.privacy.face_blur_accel,
+            )
+            if ev.privacy.face_blur_mode == "pose":
+                face_roi = face_roi_from_pose
+        if ev.saver.save_annotated:
+            from .annotate import draw_pose as draw
 
+        # Save frames (in parallel; map() keeps saved_files in frame order)
+        img_ext, params = _encode_params(ev.saver.image_format, int(ev.saver.jpeg_quality))
         saved_files = []
-        for fr in ev.frames:
-            img = fr.frame
-            if ev.privacy.face_blur:
-                img = face_blur(img, kernel=ev.privacy.blur_kernel)
-            img_anno = img
-            if ev.saver.save_annotated and fr.pose is not None:
-                img_anno = draw_pose(img, fr.pose)
-            # filenames
-            fname_anno = f"annotated_{fr.t_rel_ms}.jpg" if img_ext == ".jpg" else f"annotated_{fr.t_rel_ms}.png"
-            fpath_anno = out_dir / fname_anno
-            cv2.imwrite(str(fpath_anno), img_anno, params)
-            saved_files.append({"file": fpath_anno.name, "kind": "annotated", "t_rel_ms": fr.t_rel_ms})
-            if ev.saver.save_raw:
-                fname_raw = f"raw_{fr.t_rel_ms}.jpg" if img_ext == ".jpg" else f"raw_{fr.t_rel_ms}.png"
-                fpath_raw = out_dir / fname_raw
-                cv2.imwrite(str(fpath_raw), img, params)
-                saved_files.append({"file": fpath_raw.name, "kind": "raw", "t_rel_ms": fr.t_rel_ms})
-
-        # Optional: save clip
-        if ev.saver.video_clip.enabled and len(ev.frames) > 1:
-            fps = ev.saver.video_clip.fps
-            h, w = ev.frames[0].frame.shape[:2]
-            fourcc = cv2.VideoWriter_fourcc(*ev.saver.video_clip.codec)
-            clip_path = out_dir / "clip.mp4"
-            writer = cv2.VideoWriter(str(clip_path), fourcc, fps, (w, h))
-            for fr in ev.frames:
-                writer.write(fr.frame)
-            writer.release()
-            logging.info("Clip saved: %s", clip_path)
+        write = partial(
+            self._write_frame, ev, out_dir=out_dir, img_ext=img_ext, params=params, blur=blur, face_roi=face_roi, draw=draw
+        )
+        for entries in self.pool.map(write, ev.frames):
+            saved_files.extend(entries)
+
+        if clip_job is not None:
+            clip_job.result()
 
         # event.json
         event_json = {
@@ -151,7 +189,82 @@ class SaverWorker:
             },
         }
         meta_path = out_dir / "event.json"
-        meta_path.write_text(
-            serialize_json(event_json, redact=ev.privacy.redact_metadata), encoding="utf-8"
-        )
+        meta_path.write_bytes(serialize_json(event_json, redact=ev.privacy.redact_metadata))
         logging.info("Metadata saved: %s", meta_path)
+
+    def _write_frame(
+        self,
+        ev: CompletedEvent,
+        fr: FrameToSave,
+        out_dir: Path,
+        img_ext: str,
+        params: Tuple[int, ...],
+        blur: Optional[Callable[..., np.ndarray]] = None,
+        face_roi: Optional[Callable[..., Optional[List[Tuple[int, int, int, int]]]]] = None,
+        draw: Optional[Callable[..., np.ndarray]] = None,
+    ) -> List[Dict]:
+        # Runs on an encode thread. blur/face_roi/draw are resolved once per event by
+        # _save_event (None = disabled). Working buffers are reused across frames on the
+        # same thread; fr.frame itself is never modified
+        bufs = self._bufs
+        img = fr.frame
+        if blur is not None:
+            faces = None
+            if face_roi is not None and fr.pose is not None:
+                # face box from pose landmarks: skips detection; falls back to it when unsure
+                faces = face_roi(fr.pose, img.shape)
+            img = bufs.blur = blur(img, out=getattr(bufs, "blur", None), faces=faces)
+        img_anno = img
+        if draw is not None and fr.pose is not None:
+            if blur is not None and not ev.saver.save_raw:
+                # blurred image is already a private copy and is not saved on its own
+                img_anno = draw(img, fr.pose, inplace=True)
+            else:
+                img_anno = bufs.anno = draw(img, fr.pose, out=getattr(bufs, "anno", None))
+        saved = []
+        fname_anno = f"annotated_{fr.t_rel_ms}{img_ext}"
+        _write_image(out_dir / fname_anno, img_anno, img_ext, params)
+        saved.append({"file": fname_anno, "kind": "annotated", "t_rel_ms": fr.t_rel_ms})
+        if ev.saver.save_raw:
+            fname_raw = f"raw_{fr.t_rel_ms}{img_ext}"
+            _write_image(out_dir / fname_raw, img, img_ext, params)
+            saved.append({"file": fname_raw, "kind": "raw", "t_rel_ms": fr.t_rel_ms})
+        return saved
+
+    def _write_clip(self, ev: CompletedEvent, out_dir: Path) -> None:
+        fps = ev.saver.video_clip.fps
+        h, w = ev.frames[0].frame.shape[:2]
+        clip_path = out_dir / "clip.mp4"
+        if ev.saver.video_clip.codec.lower() in ("avc1", "h264"):
+            # H.264 through PyAV (libx264, encodes without holding the GIL) when installed;
+            # OpenCV builds often lack an avc1 writer
+            try:
+                _write_clip_pyav(clip_path, ev.frames, fps)
+                logging.info("Clip saved: %s", clip_path)
+                return
+            except ImportError:
+                pass
+            except Exception:
+                logging.warning("PyAV H.264 clip failed; falling back to cv2.VideoWriter", exc_info=True)
+        cv2 = load_cv2()
+        fourcc = cv2.VideoWriter_fourcc(*ev.saver.video_clip.codec)
+        writer = cv2.VideoWriter(str(clip_path), fourcc, fps, (w, h))
+        for fr in ev.frames:
+            writer.write(fr.frame)
+        writer.release()
+        logging.info("Clip saved: %s", clip_path)
+
+
+def _write_clip_pyav(path: Path, frames: List[FrameToSave], fps: float) -> None:
+    import av  # type: ignore  # optional dependency
+
+    h, w = frames[0].frame.shape[:2]
+    with av.open(str(path), "w") as container:
+        stream = container.add_stream("h264", rate=int(round(fps)))
+        stream.width, stream.height = w, h
+        stream.pix_fmt = "yuv420p"
+        stream.options = {"preset": "veryfast"}
+        for fr in frames:
+            vf = av.VideoFrame.from_ndarray(fr.frame, format="bgr24")
+            container.mux(stream.encode(vf))
+        container.mux(stream.encode())  # flush delayed packets
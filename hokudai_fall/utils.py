@@ -1,21 +1,45 @@
 from __future__ import annotations
 
 import datetime as dt
+import heapq
 import json
 import os
 import re
 import shutil
 import socket
+import time
 from dataclasses import asdict
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Tuple
 
+try:
+    import orjson  # optional: faster, and emits UTF-8 bytes directly
+except ImportError:  # pragma: no cover
+    orjson = None
+
 
 ISO_FMT = "%Y-%m-%dT%H:%M:%SZ"
 
+_cv2 = None
+
+
+def load_cv2():
+    # Import OpenCV on first use (then cached) so importing the package stays cheap
+    global _cv2
+    if _cv2 is None:
+        import cv2
+
+        _cv2 = cv2
+    return _cv2
+
 
 def utc_now() -> dt.datetime:
-    return dt.datetime.utcnow().replace(tzinfo=dt.timezone.utc)
+    return dt.datetime.now(dt.timezone.utc)
+
+
+def utc_from_ns(ts_ns: int) -> dt.datetime:
+    # epoch nanoseconds (time.time_ns()) -> aware UTC datetime
+    return dt.datetime.fromtimestamp(ts_ns / 1e9, tz=dt.timezone.utc)
 
 
 def iso_utc(ts: dt.datetime | None = None) -> str:
@@ -40,13 +64,15 @@ def ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
 
-def serialize_json(d: Dict[str, Any], redact: bool = False) -> str:
+def serialize_json(d: Dict[str, Any], redact: bool = False) -> bytes:
     if redact:
         d = dict(d)  # shallow copy
         sys = d.get("system", {})
         sys.pop("host", None)
         d["system"] = sys
-    return json.dumps(d, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        return orjson.dumps(d, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(d, ensure_ascii=False, indent=2).encode("utf-8")
 
 
 def disk_free_percent(path: Path) -> float:
@@ -54,28 +80,38 @@ def disk_free_percent(path: Path) -> float:
     return (usage.free / usage.total) * 100.0
 
 
+def _subdirs(paths: Iterable[str]) -> List[str]:
+    out: List[str] = []
+    for p in paths:
+        try:
+            with os.scandir(p) as it:
+                # is_dir() comes from the directory listing itself (d_type); no extra stat
+                out.extend(e.path for e in it if e.is_dir())
+        except OSError:
+            continue
+    return out
+
+
+def _scan_event_dirs(base_dir: Path) -> List[Tuple[float, str]]:
+    # (mtime, path) of every leaf event directory under base_dir/<camera>/<Y>/<M>/<D>/<event>,
+    # each directory stat'ed exactly once
+    level = [str(base_dir)]
+    for _ in range(4):
+        level = _subdirs(level)
+    result: List[Tuple[float, str]] = []
+    for p in _subdirs(level):
+        try:
+            result.append((os.stat(p).st_mtime, p))
+        except OSError:
+            continue
+    return result
+
+
 def list_event_dirs(base_dir: Path) -> List[Path]:
-    # return all leaf event directories under base_dir/*/*/*/*/*
+    # return all leaf event directories under base_dir/*/*/*/*/*, oldest first
     if not base_dir.exists():
         return []
-    result: List[Path] = []
-    for camera_dir in base_dir.iterdir():
-        if not camera_dir.is_dir():
-            continue
-        for y in camera_dir.iterdir():
-            if not y.is_dir():
-                continue
-            for m in y.iterdir():
-                if not m.is_dir():
-                    continue
-                for d in m.iterdir():
-                    if not d.is_dir():
-                        continue
-                    for e in d.iterdir():
-                        if e.is_dir():
-                            result.append(e)
-    result.sort(key=lambda p: p.stat().st_mtime)
-    return result
+    return [Path(p) for _, p in sorted(_scan_event_dirs(base_dir))]
 
 
 def remove_dir(p: Path) -> None:
@@ -93,24 +129,23 @@ def enforce_retention(base_dir: Path, retention_days: int, min_free_pct: float =
     # remove old events beyond retention_days; if free < min, remove oldest until above threshold
     if not base_dir.exists():
         return
-    now = dt.datetime.utcnow().timestamp()
+    now = time.time()
     cutoff = now - (retention_days * 86400)
-    events = list_event_dirs(base_dir)
-    # remove older than cutoff
-    for e in events:
-        try:
-            if e.stat().st_mtime < cutoff:
-                remove_dir(e)
-        except Exception:
-            pass
+    # one scan serves both passes; survivors go into a min-heap keyed by mtime
+    remaining: List[Tuple[float, str]] = []
+    for mtime, p in _scan_event_dirs(base_dir):
+        # remove older than cutoff
+        if mtime < cutoff:
+            remove_dir(Path(p))
+        else:
+            remaining.append((mtime, p))
+    heapq.heapify(remaining)
     # if free space too low, remove oldest regardless of age
-    while True:
+    while remaining:
         try:
             if disk_free_percent(base_dir) >= min_free_pct:
                 break
         except Exception:
             break
-        events = list_event_dirs(base_dir)
-        if not events:
-            break
-        remove_dir(events[0])
+        _, oldest = heapq.heappop(remaining)
+        remove_dir(Path(oldest))
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import logging
+import time
+
+import numpy as np
+
+from ._fsm_kernels import drop_from_prior_min, still_score
+
+
+def warmup_kernels() -> None:
+    # Call every JIT kernel once with dummy data so Numba compiles (or loads its
+    # on-disk cache) at startup instead of on the first fall event.
+    t0 = time.perf_counter()
+    dummy = np.zeros(8, dtype=np.float32)
+    still_score(dummy, 0.5)
+    drop_from_prior_min(dummy)
+    logging.debug("FSM kernels ready in %.1f ms", (time.perf_counter() - t0) * 1000.0)